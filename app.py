@@ -1,9 +1,13 @@
 import streamlit as st
-import json
+import httpx
+import msgspec
 import os
+import re
 import time
 from datetime import datetime
-from groq import Groq
+from pathlib import Path
+from groq import DefaultHttpxClient, Groq
+from models import Digest, decode_chat_bodies, decode_digest, decode_topic
 
 # ─── 0. Security Check ───────────────────────────────────────────────────────
 if "GROQ_API_KEY" not in st.secrets:
@@ -71,30 +75,140 @@ st.markdown("""
 
 # ─── 2. Data Loading & Generators ────────────────────────────────────────────
 DATA_FILE = "daily_data.json"
+CHAT_ARTICLES_FILE = "daily_chat_context.json"  # link -> full article body, written alongside DATA_FILE
+TOPIC_DIR = Path("data/topics")  # per-topic results the bot writes as each topic finishes
+# Opt back into the artificial "thinking" pause before the first summary render
+SHOW_FAKE_LATENCY = os.environ.get("SHOW_FAKE_LATENCY") == "1"
 
+def _mtime(path) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+def get_data_mtime() -> float:
+    """Newest of the full digest and any per-topic files from a later (in-progress) bot run."""
+    return max([_mtime(DATA_FILE)] + [_mtime(p) for p in TOPIC_DIR.glob("*.json")])
+
+# mtime is part of the cache key so a fresh bot run invalidates everything derived from the file
 @st.cache_data(ttl=300)
-def load_data() -> dict:
-    if not os.path.exists(DATA_FILE):
-        return {}
+def load_data(mtime: float = 0.0) -> Digest:
+    digest = Digest(topics={})
+    if os.path.exists(DATA_FILE):
+        try:
+            with open(DATA_FILE, "rb") as f:
+                digest = decode_digest(f.read())
+        except (msgspec.DecodeError, IOError):
+            pass
+    # Topics the bot has finished since the last full digest was written take precedence
+    digest_mtime = _mtime(DATA_FILE)
+    for path in TOPIC_DIR.glob("*.json"):
+        if _mtime(path) > digest_mtime:
+            try:
+                digest.topics[path.stem] = decode_topic(path.read_bytes())
+            except (msgspec.DecodeError, IOError):
+                continue
+    return digest
+
+# Only read when a topic has no chat_context gist, so most sessions never touch it
+@st.cache_data(ttl=300)
+def load_chat_bodies(mtime: float = 0.0) -> dict:
     try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
+        with open(CHAT_ARTICLES_FILE, "rb") as f:
+            return decode_chat_bodies(f.read())
+    except (msgspec.DecodeError, IOError):
         return {}
 
-data = load_data()
+@st.cache_data
+def build_context(topic: str, mtime: float) -> str:
+    """Builds the RAG chat context once per data file version."""
+    topic_data = load_data(mtime).topics.get(topic)
+    if topic_data is None:
+        return ""
+    # The bot's ~200-token fact gist is far cheaper to resend each turn than full articles
+    if topic_data.chat_context:
+        return topic_data.chat_context
+    # Fall back to full bodies (files older than the split still carry them inline),
+    # preferring the LLMLingua-compressed text so each chat turn sends fewer tokens
+    bodies = load_chat_bodies(mtime)
+    parts = []
+    for a in topic_data.articles:
+        body = bodies.get(a.link, a)
+        parts.append(f"Title: {a.title}\nSource: {a.source}\nContent: {body.compressed_text or body.text}")
+    return "\n\n".join(parts)
+
+SYSTEM_TEMPLATE = (
+    "You are Market Digest, an expert news analyst. "
+    "Answer the user's question based ONLY on the following news context. "
+    "If the answer is not in the context, say so honestly.\n\n"
+    "--- NEWS CONTEXT ---\n"
+    "{context}\n"
+    "--- END CONTEXT ---"
+)
+
+@st.cache_data
+def system_prompt_for(topic: str, mtime: float) -> str:
+    """Renders the chat system prompt once per topic and data file version."""
+    return SYSTEM_TEMPLATE.format(context=build_context(topic, mtime))
+
+@st.cache_data
+def compute_meta(mtime: float) -> dict:
+    """Derives the header values once per data file version instead of on every rerun."""
+    data = load_data(mtime)
+    if data.meta is not None:
+        digest_date = datetime.fromisoformat(data.meta.generated_at).strftime("%B %d, %Y")
+    elif mtime:
+        digest_date = datetime.fromtimestamp(mtime).strftime("%B %d, %Y")
+    else:
+        digest_date = "Unknown"
+    topics = list(data.topics)
+    return {
+        "digest_date": digest_date,
+        "total_articles": sum(len(t.articles) for t in data.topics.values()),
+        "available_topics": topics or ["Tech", "Finance", "World News"],
+    }
+
+# One client per server process so chat turns reuse its warm connection pool;
+# HTTP/2 lets concurrent sessions multiplex over it instead of queueing for sockets
+@st.cache_resource
+def get_groq() -> Groq:
+    return Groq(
+        api_key=st.secrets["GROQ_API_KEY"],
+        http_client=DefaultHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            timeout=httpx.Timeout(30),
+        ),
+    )
+
+data_mtime = get_data_mtime()
+data = load_data(data_mtime)
+digest_meta = compute_meta(data_mtime)
 
 # Generator for the "AI Typing" Vibe
-def stream_text(text, delay=0.02):
-    """Yields text word-by-word to simulate an AI typing smoothly, preserving newlines."""
-    lines = text.split("\n")
-    for i, line in enumerate(lines):
-        words = line.split()
-        for word in words:
-            yield word + " "
-            time.sleep(delay)
-        if i < len(lines) - 1:
-            yield "\n"
+def stream_text(text, chunk=64):
+    """Yields the (already local) summary in small chunks so it renders progressively without sleeping."""
+    for i in range(0, len(text), chunk):
+        yield text[i:i + chunk]
+
+def stream_deltas(stream):
+    """Yields only the non-empty text deltas from a Groq chat stream."""
+    for chunk in stream:
+        # Some chunks (e.g. the trailing usage chunk) carry no choices at all
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def compact_history(msgs, keep_last=2, max_chars=120):
+    """Keeps the last `keep_last` user/assistant pairs verbatim and squeezes older turns to one line."""
+    cutoff = max(len(msgs) - keep_last * 2, 0)
+    compacted = []
+    for i, m in enumerate(msgs):
+        content = m["content"]
+        if i < cutoff:
+            line = re.sub(r"\s+", " ", content).strip()
+            content = line if len(line) <= max_chars else line[:max_chars] + "…"
+        compacted.append({"role": m["role"], "content": content})
+    return compacted
 
 # ─── 3. Session State Management ─────────────────────────────────────────────
 if "current_topic" not in st.session_state:
@@ -106,7 +220,7 @@ if "typed_summaries" not in st.session_state:
 if "chat_histories" not in st.session_state:
     st.session_state.chat_histories = {} # Keeps chat history isolated per topic
 
-available_topics = [k for k in data.keys() if k != "_meta"] if data else ["Tech", "Finance", "World News"]
+available_topics = digest_meta["available_topics"]
 
 # Topic Descriptions for the Landing Page Cards
 TOPIC_DESCS = {
@@ -120,16 +234,95 @@ TOPIC_DESCS = {
 }
 
 # ─── Helper: Digest Date ─────────────────────────────────────────────────────
-meta = data.get("_meta", {})
-generated_at = meta.get("generated_at")
-if generated_at:
-    digest_date = datetime.fromisoformat(generated_at).strftime("%B %d, %Y")
-else:
-    try:
-        mtime = os.path.getmtime(DATA_FILE)
-        digest_date = datetime.fromtimestamp(mtime).strftime("%B %d, %Y")
-    except OSError:
-        digest_date = "Unknown"
+digest_date = digest_meta["digest_date"]
+
+# ─── Helper: Page Fragments ──────────────────────────────────────────────────
+@st.fragment
+def render_topic_nav():
+    """Sticky topic bar; clicking the already-active topic only reruns this fragment."""
+    # Equal-width rounded rectangle buttons for each topic
+    st.markdown('<div class="topic-nav-bar">', unsafe_allow_html=True)
+    nav_cols = st.columns(len(available_topics))
+    for idx, topic in enumerate(available_topics):
+        with nav_cols[idx]:
+            is_active = (topic == st.session_state.current_topic)
+            if st.button(topic, key=f"nav_{topic}", use_container_width=True, type="secondary"):
+                if not is_active:
+                    st.session_state.current_topic = topic
+                    st.rerun()
+            # Highlight the active button via injected JS/CSS
+            if is_active:
+                st.markdown(
+                    f"""<style>div.topic-nav-bar div[data-testid="stColumn"]:nth-child({idx + 1}) button {{
+                        background-color: #4A90D9 !important;
+                        color: white !important;
+                        border-color: #4A90D9 !important;
+                    }}</style>""",
+                    unsafe_allow_html=True,
+                )
+    st.markdown('</div>', unsafe_allow_html=True)
+
+@st.fragment
+def render_sources(articles):
+    """Source list for the current topic."""
+    with st.expander(f"🔗 View Validated Sources ({len(articles)})", expanded=False):
+        if articles:
+            for idx, article in enumerate(articles, start=1):
+                title = article.title or "Untitled"
+                url = article.link or "#"
+                source = article.source or "Unknown source"
+                snippet = article.snippet or article.text[:400]
+                
+                st.markdown(f"**{idx}. [{title}]({url})** \n*{source}*")
+                if snippet:
+                    st.caption(snippet.replace('\n', ' ') + "…")
+                st.divider()
+
+# A chat submission only reruns this fragment, so the header, summary and source
+# list aren't rebuilt per message (the input renders inline instead of pinned)
+@st.fragment
+def render_chat(topic):
+    """Per-topic RAG chat: history, input, and the streamed Groq reply."""
+    st.divider()
+    st.subheader(f"💬 Chat with {topic} Data")
+    
+    # Isolate chat history for THIS specific topic
+    if topic not in st.session_state.chat_histories:
+        st.session_state.chat_histories[topic] = []
+        
+    current_chat = st.session_state.chat_histories[topic]
+
+    # Display isolated chat history
+    for msg in current_chat:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+
+    if prompt := st.chat_input(f"Ask about today's {topic} news…"):
+        current_chat.append({"role": "user", "content": prompt})
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        system_prompt = system_prompt_for(topic, data_mtime)
+
+        messages_for_llm = [{"role": "system", "content": system_prompt}] + compact_history(current_chat[-6:])
+
+        with st.chat_message("assistant"):
+            try:
+                client = get_groq()
+                stream = client.chat.completions.create(
+                    model="llama-3.3-70b-versatile",
+                    messages=messages_for_llm,
+                    temperature=0.3,
+                    max_tokens=1024,
+                    stream=True,
+                )
+
+                response_text = st.write_stream(stream_deltas(stream))
+            except Exception as e:
+                response_text = f"⚠️ Could not reach the AI service: `{e}`"
+                st.error(response_text)
+
+        current_chat.append({"role": "assistant", "content": response_text})
 
 # ─── 4. Header & Metrics Dashboard (Always Visible) ──────────────────────────
 col_title, col_met1, col_met2, col_met3 = st.columns([3, 1, 1, 1])
@@ -138,7 +331,7 @@ with col_title:
     st.markdown("### 🧠 Market Digest")
     st.caption(f"Your AI-powered daily news digest — 🗓️ {digest_date}")
 
-total_articles = sum(len(v.get("articles", [])) for k, v in data.items() if k != "_meta")
+total_articles = digest_meta["total_articles"]
 
 with col_met1:
     st.metric("Articles Processed Today", str(total_articles), delta="Live")
@@ -173,51 +366,28 @@ if st.session_state.current_topic is None:
 # ─── 6. Digest View (After Topic is Selected) ────────────────────────────────
 else:
     # --- STICKY TOP NAVIGATION ---
-    # Equal-width rounded rectangle buttons for each topic
-    st.markdown('<div class="topic-nav-bar">', unsafe_allow_html=True)
-    nav_cols = st.columns(len(available_topics))
-    for idx, topic in enumerate(available_topics):
-        with nav_cols[idx]:
-            is_active = (topic == st.session_state.current_topic)
-            if st.button(topic, key=f"nav_{topic}", use_container_width=True, type="secondary"):
-                if not is_active:
-                    st.session_state.current_topic = topic
-                    st.rerun()
-            # Highlight the active button via injected JS/CSS
-            if is_active:
-                st.markdown(
-                    f"""<style>div.topic-nav-bar div[data-testid="stColumn"]:nth-child({idx + 1}) button {{
-                        background-color: #4A90D9 !important;
-                        color: white !important;
-                        border-color: #4A90D9 !important;
-                    }}</style>""",
-                    unsafe_allow_html=True,
-                )
-    st.markdown('</div>', unsafe_allow_html=True)
+    render_topic_nav()
 
     st.markdown("<br>", unsafe_allow_html=True)
 
     # Fetch Data for selected topic
-    topic_data = data.get(st.session_state.current_topic, {})
-    if not topic_data:
+    topic_data = data.topics.get(st.session_state.current_topic)
+    if topic_data is None:
         st.warning(f"No data available for {st.session_state.current_topic} yet.")
         st.stop()
 
     # --- THE "VIBE" LOADING & STREAMING ---
-    summary = topic_data.get("summary", "_No summary available._")
+    summary = topic_data.summary or "_No summary available._"
     
     st.subheader(f"📰 Today's {st.session_state.current_topic} Digest")
     
     # Check if we've already streamed this topic today. If not, do the animation.
     if st.session_state.current_topic not in st.session_state.typed_summaries:
-        with st.spinner("Analyzing cross-source intelligence..."):
-            time.sleep(1.5) # The "Thinking" illusion
-        
-        # Split summary into markdown sections and stream each one
-        sections = summary.split("\n## ")
-        for i, section in enumerate(sections):
-            section_text = section if i == 0 else f"## {section}"
-            st.write_stream(stream_text(section_text))
+        if SHOW_FAKE_LATENCY:
+            with st.spinner("Analyzing cross-source intelligence..."):
+                time.sleep(1.5) # The "Thinking" illusion
+
+        st.write_stream(stream_text(summary))
         
         st.session_state.typed_summaries.add(st.session_state.current_topic)
     else:
@@ -225,74 +395,7 @@ else:
         st.markdown(summary)
 
     # --- SOURCE TRANSPARENCY ---
-    articles = topic_data.get("articles", [])
-    with st.expander(f"🔗 View Validated Sources ({len(articles)})", expanded=False):
-        if articles:
-            for idx, article in enumerate(articles, start=1):
-                title = article.get("title", "Untitled")
-                url = article.get("url", "#")
-                source = article.get("source", "Unknown source")
-                snippet = article.get("text", article.get("description", ""))[:400]
-                
-                st.markdown(f"**{idx}. [{title}]({url})** \n*{source}*")
-                if snippet:
-                    st.caption(snippet.replace('\n', ' ') + "…")
-                st.divider()
+    render_sources(topic_data.articles)
 
     # --- RAG CHAT INTERFACE ---
-    st.divider()
-    st.subheader(f"💬 Chat with {st.session_state.current_topic} Data")
-    
-    # Isolate chat history for THIS specific topic
-    if st.session_state.current_topic not in st.session_state.chat_histories:
-        st.session_state.chat_histories[st.session_state.current_topic] = []
-        
-    current_chat = st.session_state.chat_histories[st.session_state.current_topic]
-
-    context_text = "\n\n".join(
-        f"Title: {a.get('title', '')}\nSource: {a.get('source', '')}\nContent: {a.get('text', '')}"
-        for a in articles
-    )
-
-    # Display isolated chat history
-    for msg in current_chat:
-        with st.chat_message(msg["role"]):
-            st.markdown(msg["content"])
-
-    if prompt := st.chat_input(f"Ask about today's {st.session_state.current_topic} news…"):
-        current_chat.append({"role": "user", "content": prompt})
-        with st.chat_message("user"):
-            st.markdown(prompt)
-
-        system_prompt = (
-            "You are Market Digest, an expert news analyst. "
-            "Answer the user's question based ONLY on the following news context. "
-            "If the answer is not in the context, say so honestly.\n\n"
-            "--- NEWS CONTEXT ---\n"
-            f"{context_text}\n"
-            "--- END CONTEXT ---"
-        )
-
-        messages_for_llm = [{"role": "system", "content": system_prompt}] + [
-            {"role": m["role"], "content": m["content"]} for m in current_chat[-6:]
-        ]
-
-        with st.chat_message("assistant"):
-            try:
-                client = Groq(api_key=st.secrets["GROQ_API_KEY"])
-                stream = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=messages_for_llm,
-                    temperature=0.3,
-                    max_tokens=1024,
-                    stream=True,
-                )
-
-                response_text = st.write_stream(
-                    (chunk.choices[0].delta.content or "" for chunk in stream)
-                )
-            except Exception as e:
-                response_text = f"⚠️ Could not reach the AI service: `{e}`"
-                st.error(response_text)
-
-        current_chat.append({"role": "assistant", "content": response_text})
+    render_chat(st.session_state.current_topic)
@@ -1,24 +1,31 @@
+import asyncio
 import feedparser
-import json
+import httpx
+import importlib.util
+import msgspec
 import os
-import nltk
+import re
+import threading
+import time
+from collections import Counter, defaultdict
 from datetime import datetime, timezone
-from newspaper import Article
-from groq import Groq
+from html import unescape
+from html.entities import name2codepoint
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from groq import AsyncGroq, DefaultAsyncHttpxClient
+from llm_cache import cached_completion
+from lxml import etree
+from models import Article, ArticleBody, Meta, Topic, encode_chat_bodies, encode_digest, encode_topic, write_atomic
+from selectolax.lexbor import LexborHTMLParser
 
-# --- Configuration ---
-
-client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+# LLMLingua-2 is optional: it pulls in torch + a ~500 MB model, so the bot
+# falls back to uncompressed article text when it isn't installed. Only its
+# presence is checked here; torch isn't imported until the first compression.
+HAS_LLMLINGUA = importlib.util.find_spec("llmlingua") is not None
 
-# --- AUTO-FIX NLTK ---
-# checks if the necessary data exists. 
-# if not, downloads silently.
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    print("⏳ Downloading NLTK data...")
-    nltk.download('punkt', quiet=True)
-# ---------------------
+# --- Configuration ---
 
 TOPICS = {
     "Tech": [
@@ -65,179 +72,633 @@ TOPICS = {
     ],
 }
 
+# Every topic is summarized concurrently, so keep a warm HTTP/2 connection per topic
+client = AsyncGroq(
+    api_key=os.environ.get("GROQ_API_KEY"),
+    http_client=DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=len(TOPICS), max_keepalive_connections=len(TOPICS)),
+        timeout=httpx.Timeout(30),
+    ),
+    # All topics hit the API at once, so ride out 429s (the SDK backs off and honours
+    # retry-after) rather than falling back to the "summary failed" placeholder
+    max_retries=5,
+)
+
 
 # --- Step 2: Fetching & Scraping ---
 
-def fetch_news(rss_urls, max_articles=5):
-    """Fetch articles from RSS feeds, mixing sources to reduce single-source bias."""
-    # Step 1: Parse all feeds and collect candidate entries per source
-    feed_entries = []  # list of (entry, feed_title) grouped by feed
-    for url in rss_urls:
+REQUEST_TIMEOUT = 10  # seconds per feed/article request
+USER_AGENT = "Mozilla/5.0 (compatible; MarketDigestBot/1.0)"
+MAX_HTML_BYTES = 1_000_000  # stop downloading pathological pages; article markup sits well within this
+MAX_BODY_CHARS = 20_000  # extracted text considered for the LLM, from the top
+MAX_PER_HOST = 4  # concurrent article downloads per site, so topics sharing a publisher don't hammer it
+
+FEED_CACHE_FILE = "feed_cache.json"
+ARTICLE_CACHE_FILE = Path("data/article_cache.json")
+ARTICLE_CACHE_TTL = 3 * 24 * 3600  # seconds; feeds rarely list an item for longer
+_ENTRY_FIELDS = ("title", "link", "published")
+
+TEXT_BUDGET = 2000  # chars of article text kept for the LLM
+LEDE_SENTENCES = 2
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"[a-z0-9']+")
+_WHITESPACE = re.compile(r"\s+")
+_STOPWORDS = frozenset(
+    "a an the and or but if of to in on for with at by from as is are was were be been being "
+    "it its this that these those he she they we you i his her their our has have had not no "
+    "will would can could should may might said says also than then there about into over".split()
+)
+
+# Feed parsing: RSS 2.0 (no namespace), RSS 1.0 (RDF) and Atom all match. Extension
+# namespaces reuse the same names (media:title, itunes:title, atom:link), so fields
+# are only read from these, plus Dublin Core for the date
+_ATOM_NS = "http://www.w3.org/2005/Atom"
+_RSS1_NS = "http://purl.org/rss/1.0/"
+_DC_NS = "http://purl.org/dc/elements/1.1/"
+_FEED_NS = (None, _ATOM_NS, _RSS1_NS)
+_FEED_PARSER = etree.XMLParser(recover=True, resolve_entities=False, no_network=True)
+_HTML_ENTITY = re.compile(rb"&([A-Za-z][A-Za-z0-9]*);")
+_XML_ENTITIES = frozenset({"amp", "lt", "gt", "quot", "apos"})
+_FEED_ITEMS = etree.XPath("//*[local-name()='item' or local-name()='entry']")
+_FEED_TITLE = etree.XPath(
+    "(/*/*[local-name()='title'] | /*/*[local-name()='channel']/*[local-name()='title'])"
+    "[namespace-uri()='' or namespace-uri()=$atom or namespace-uri()=$rss1]"
+)
+# (namespace, element local name) -> entry field (pubDate is RSS, published is Atom, date is Dublin Core)
+_FEED_FIELD_NAMES = {
+    **{(ns, "title"): "title" for ns in _FEED_NS},
+    **{(ns, "link"): "link" for ns in _FEED_NS},
+    (None, "pubDate"): "published",
+    (_ATOM_NS, "published"): "published",
+    (_DC_NS, "date"): "published",
+}
+
+# Query params that only track the click, so the same story linked from two feeds dedups
+_TRACKING_PARAMS = frozenset(
+    {"fbclid", "gclid", "ref_src", "cmpid", "ocid", "taid", "guccounter", "guce_referrer", "guce_referrer_sig"}
+)
+
+MAX_LINK_DENSITY = 0.5  # share of a paragraph's text inside <a> tags above which it's boilerplate
+
+# Tags whose text is never article prose
+_NON_CONTENT_TAGS = ["script", "style", "noscript", "nav", "header", "footer", "aside", "form"]
+
+
+def make_http_client():
+    """One pooled HTTP/2 client shared by every feed and article request."""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=32),
+        timeout=REQUEST_TIMEOUT,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT},
+    )
+
+
+def canonical_link(link):
+    """Normalize a feed link (host case, tracking params, fragment) so one story maps to one key.
+
+    Only used for deduplication; the original link is what gets fetched and stored.
+    """
+    if not link:
+        return link
+    parts = urlsplit(link.strip())
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not (k.lower().startswith("utm_") or k.lower() in _TRACKING_PARAMS)
+    ]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+def extract_text(html):
+    """Pull readable body text out of an article page, returning (title, text)."""
+    tree = LexborHTMLParser(html)
+    title_node = tree.css_first("title")
+    title = title_node.text(strip=True) if title_node else ""
+    tree.strip_tags(_NON_CONTENT_TAGS)
+    root = tree.css_first("article") or tree.body
+    if root is None:
+        return title, ""
+    paragraphs = []
+    for node in root.css("p"):
+        # No separator: one between inline tags (<a>, <em>) would land before punctuation
+        para = _WHITESPACE.sub(" ", node.text()).strip()
+        # Mostly-link paragraphs are "Related:" lists, bylines and share bars, not prose
+        link_chars = sum(len(a.text(strip=True)) for a in node.css("a"))
+        if para and link_chars <= MAX_LINK_DENSITY * len(para):
+            paragraphs.append(para)
+    text = "\n\n".join(paragraphs)
+    return title, text or _WHITESPACE.sub(" ", root.text()).strip()
+
+
+class CachedFeed(msgspec.Struct):
+    """A feed's validators and minimal entries, kept for the next run's conditional GET."""
+    source: str
+    entries: list[dict[str, str]]
+    etag: Optional[str] = None
+    modified: Optional[str] = None
+
+
+class CachedArticle(msgspec.Struct):
+    """An article's extracted text, kept so the page isn't downloaded again while it's listed."""
+    title: str
+    snippet: str
+    text: str
+    fetched: float
+
+
+_feed_cache_decoder = msgspec.json.Decoder(dict[str, CachedFeed])
+_article_cache_decoder = msgspec.json.Decoder(dict[str, CachedArticle])
+
+
+def load_feed_cache():
+    """Load per-feed ETag/Last-Modified validators and entries from the previous run."""
+    try:
+        return _feed_cache_decoder.decode(Path(FEED_CACHE_FILE).read_bytes())
+    except (OSError, msgspec.DecodeError):
+        return {}
+
+
+def save_feed_cache(feed_cache):
+    """Persist feed validators and entries for the next run's conditional GETs."""
+    write_atomic(FEED_CACHE_FILE, msgspec.json.encode(feed_cache))
+
+
+def load_article_cache():
+    """Load article bodies scraped by earlier runs, dropping ones older than ARTICLE_CACHE_TTL."""
+    try:
+        article_cache = _article_cache_decoder.decode(ARTICLE_CACHE_FILE.read_bytes())
+    except (OSError, msgspec.DecodeError):
+        return {}
+    now = time.time()
+    return {link: body for link, body in article_cache.items() if now - body.fetched < ARTICLE_CACHE_TTL}
+
+
+def save_article_cache(article_cache):
+    """Persist scraped bodies so articles still listed tomorrow aren't downloaded again."""
+    ARTICLE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(ARTICLE_CACHE_FILE, msgspec.json.encode(article_cache))
+
+
+def extract_salient(text, budget=TEXT_BUDGET):
+    """Sentence-level extractive compression of an article down to `budget` chars.
+
+    SumBasic: repeatedly keep the sentence whose content words are most frequent in
+    the article, then down-weight those words so the next pick adds new information.
+    The lede always goes in first and the kept sentences stay in original order.
+    """
+    if len(text) <= budget:
+        return text
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+    words = [{w for w in _WORD.findall(s.lower()) if w not in _STOPWORDS} for s in sentences]
+    counts = Counter(w for ws in words for w in ws)
+    total = sum(counts.values()) or 1
+    weight = {w: c / total for w, c in counts.items()}
+
+    keep, used = [], 0
+    candidates = list(range(len(sentences)))
+    lede = candidates[:LEDE_SENTENCES]
+    while candidates:
+        if lede:
+            i = lede.pop(0)
+        else:
+            i = max(candidates, key=lambda j: sum(weight[w] for w in words[j]) / (len(words[j]) or 1))
+        candidates.remove(i)
+        if used + len(sentences[i]) + 1 > budget:
+            continue
+        keep.append(i)
+        used += len(sentences[i]) + 1
+        for w in words[i]:
+            weight[w] **= 2
+    if not keep:  # one giant sentence
+        return text[:budget]
+    return " ".join(sentences[i] for i in sorted(keep))
+
+
+def _numeric_entity(match):
+    name = match.group(1).decode()
+    if name in _XML_ENTITIES or name not in name2codepoint:
+        return match.group(0)
+    return b"&#%d;" % name2codepoint[name]
+
+
+def parse_feed(content):
+    """Pull (feed_title, entries) out of RSS/Atom bytes, keeping only the fields we use.
+
+    A direct lxml pass over <item>/<entry> elements; feedparser's full sanitizing
+    parse is the fallback for feeds lxml can't read cleanly.
+    """
+    # HTML entities XML doesn't define (&nbsp;, &rsquo;) become numeric references
+    # first: on an undeclared entity libxml2's recovery silently drops every later &amp;
+    content = _HTML_ENTITY.sub(_numeric_entity, content)
+    try:
+        root = etree.fromstring(content, _FEED_PARSER)
+    except etree.XMLSyntaxError:
+        root = None
+    entity_errors = any(e.type_name == "ERR_UNDECLARED_ENTITY" for e in _FEED_PARSER.error_log)
+    items = _FEED_ITEMS(root) if root is not None and not entity_errors else []
+    if not items:
+        feed = feedparser.parse(content)
+        entries = [{key: entry[key] for key in _ENTRY_FIELDS if key in entry} for entry in feed.entries]
+        return feed.feed.get("title", "Unknown Source"), entries
+
+    entries = []
+    for item in items:
+        entry = {}
+        for child in item:
+            if not isinstance(child.tag, str):  # comments, processing instructions
+                continue
+            qname = etree.QName(child)
+            field = _FEED_FIELD_NAMES.get((qname.namespace, qname.localname))
+            if field == "link":
+                # Atom puts the URL in href (rel="alternate" or no rel); RSS in the text
+                if child.get("href") and child.get("rel", "alternate") == "alternate":
+                    entry.setdefault("link", child.get("href").strip())
+                elif child.text and child.text.strip():
+                    entry.setdefault("link", child.text.strip())
+            elif field is not None:
+                # CDATA titles keep their entities (&amp;, &#160;) as literal text
+                text = unescape("".join(child.itertext()).strip())
+                if text:
+                    entry.setdefault(field, text)
+        entries.append(entry)
+    titles = _FEED_TITLE(root, atom=_ATOM_NS, rss1=_RSS1_NS)
+    source_name = "".join(titles[0].itertext()).strip() if titles else ""
+    return source_name or "Unknown Source", entries
+
+
+async def _parse_feed(http, url, feed_cache):
+    """Fetch and parse a single RSS feed, returning its (entry, source_name) pairs.
+
+    Sends a conditional GET; on 304 the entries cached from the last run are reused.
+    """
+    cached = feed_cache.get(url)
+    headers = {}
+    if cached is not None and cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached is not None and cached.modified:
+        headers["If-Modified-Since"] = cached.modified
+    try:
+        response = await http.get(url, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            source_name, entries = cached.source, cached.entries
+        else:
+            response.raise_for_status()
+            source_name, entries = parse_feed(response.content)
+            feed_cache[url] = CachedFeed(
+                source=source_name,
+                entries=entries,
+                etag=response.headers.get("ETag"),
+                modified=response.headers.get("Last-Modified"),
+            )
+        return [(entry, source_name) for entry in entries]
+    except Exception as e:
+        print(f"  ⚠️  Could not parse feed: {url} — {e}")
+        return []
+
+
+def make_host_slots():
+    """Per-host semaphores, shared by every topic in a run, capping downloads to MAX_PER_HOST."""
+    return defaultdict(lambda: asyncio.Semaphore(MAX_PER_HOST))
+
+
+async def _download_capped(http, link):
+    """GET an article page, reading at most MAX_HTML_BYTES of it."""
+    async with http.stream("GET", link) as response:
+        response.raise_for_status()
+        raw = bytearray()
+        async for chunk in response.aiter_bytes():
+            raw += chunk
+            if len(raw) >= MAX_HTML_BYTES:
+                break  # leaving the block closes the stream without reading the rest
+        return raw[:MAX_HTML_BYTES].decode(response.encoding or "utf-8", errors="replace")
+
+
+async def _scrape(http, host_slots, article_cache, entry, source_name, link, key):
+    """Download a single article and extract its text, reusing a cached body when there is one.
+
+    `link` is the feed's own URL, which is what gets fetched and stored; `key` is its
+    canonical form, used only to look up and store the cached body.
+    """
+    body = article_cache.get(key)
+    if body is None:
         try:
-            feed = feedparser.parse(url)
-            source_name = feed.feed.get("title", "Unknown Source")
-            entries = [(entry, source_name) for entry in feed.entries]
-            if entries:
-                feed_entries.append(entries)
+            async with host_slots[httpx.URL(link).host]:
+                html = await _download_capped(http, link)
+            page_title, text = extract_text(html)
         except Exception as e:
-            print(f"  ⚠️  Could not parse feed: {url} — {e}")
-            continue
+            print(f"  ⚠️  Could not scrape article: {link} — {e}")
+            return None
+        # News leads with the story, so the tail of a very long body isn't worth scoring
+        text = text[:MAX_BODY_CHARS]
+        body = CachedArticle(title=page_title, snippet=text[:400], text=extract_salient(text), fetched=time.time())
+        article_cache[key] = body
+    return Article(
+        title=entry.get("title", body.title or "No Title"),
+        link=link,
+        published=entry.get("published", "Unknown"),
+        source=source_name,
+        snippet=body.snippet,
+        text=body.text,
+    )
+
+
+def _round_robin(feed_entries, claimed):
+    """Yield (entry, source_name, link, key) one feed at a time so no single source dominates.
+
+    Each turn advances that feed past entries whose link is already claimed, so a
+    duplicate costs the feed nothing. Lazy, so claims made while scraping count too.
+    """
+    feeds = [iter(entries) for entries in feed_entries]
+    while feeds:
+        for feed in list(feeds):
+            for entry, source_name in feed:
+                link = entry.get("link")
+                key = canonical_link(link)
+                if link and key not in claimed:
+                    yield entry, source_name, link, key
+                    break
+            else:  # this feed has run out
+                feeds.remove(feed)
+
+
+async def fetch_news(http, host_slots, article_cache, feed_tasks, claimed, max_articles=5):
+    """Fetch articles from RSS feeds, mixing sources to reduce single-source bias.
+
+    `feed_tasks` are this topic's feed fetches, shared with any other topic
+    listing the same feed. `claimed` is the run-wide set of links already taken
+    by a topic, so an article shared by overlapping feeds is scraped and
+    summarized only once.
+    """
+    # Step 1: Wait for this topic's feeds and collect candidate entries per source
+    feeds = await asyncio.gather(*feed_tasks)
+    feed_entries = [entries for entries in feeds if entries]
 
     if not feed_entries:
         return []
 
-    # Step 2: Round-robin across feeds so no single source dominates
+    # Step 2: Scrape round-robin candidates concurrently, keeping one download in
+    # flight per remaining slot; as each finishes, a failure is backfilled right
+    # away with the next candidate instead of waiting for the rest of its batch
+    pending = enumerate(_round_robin(feed_entries, claimed))
+    in_flight = {}
     selected = []
-    seen_links = set()
-    max_per_round = 1  # take 1 article from each feed per round
-    while len(selected) < max_articles and feed_entries:
-        exhausted = []
-        for feed_idx, entries in enumerate(feed_entries):
-            if len(selected) >= max_articles:
-                break
-            taken = 0
-            while entries and taken < max_per_round:
-                entry, source_name = entries.pop(0)
-                link = getattr(entry, "link", None)
-                if not link or link in seen_links:
-                    continue
-                seen_links.add(link)
-                try:
-                    art = Article(link)
-                    art.download()
-                    art.parse()
-                    selected.append({
-                        "title": entry.get("title", art.title or "No Title"),
-                        "link": link,
-                        "text": art.text[:2000] if art.text else "",
-                        "published": entry.get("published", "Unknown"),
-                        "source": source_name,
-                    })
-                    taken += 1
-                except Exception as e:
-                    print(f"  ⚠️  Could not scrape article: {link} — {e}")
-                    continue
-            if not entries:
-                exhausted.append(feed_idx)
-        # Remove fully-consumed feeds (iterate in reverse to keep indices stable)
-        for idx in reversed(exhausted):
-            feed_entries.pop(idx)
-
-    return selected[:max_articles]
+
+    def launch():
+        # Claim links right before downloading so no other topic scrapes them too
+        for rank, (entry, source_name, link, key) in pending:
+            claimed.add(key)
+            in_flight[asyncio.ensure_future(_scrape(http, host_slots, article_cache, entry, source_name, link, key))] = rank
+            return
+
+    for _ in range(max_articles):
+        launch()
+    while in_flight:
+        done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            rank = in_flight.pop(task)
+            art = task.result()
+            if art is not None:
+                selected.append((rank, art))
+            elif len(selected) + len(in_flight) < max_articles:
+                launch()
+
+    # Keep the round-robin order regardless of which download finished first
+    return [art for _, art in sorted(selected, key=lambda pair: pair[0])]
 
 
 # --- Step 3: AI Summarization ---
 
-def generate_summary(topic, articles):
-    """Use Groq (Llama 3 8b) to generate an executive summary of the articles."""
-    if not articles:
-        return "No articles were available to summarize for this topic."
+COMPRESSION_MODEL = "microsoft/llmlingua-2-xlm-roberta-large-meetingbank"
+COMPRESSION_RATE = 0.5  # fraction of tokens LLMLingua-2 keeps
+
+_compressor = None
+_compressor_lock = threading.Lock()  # topics compress in worker threads; load the model once
+
+# Prompt size bounds, estimated at ~4 chars per token (Llama's tokenizer isn't available locally)
+CHARS_PER_TOKEN = 4
+ARTICLE_TOKEN_BUDGET = 400
+PROMPT_TOKEN_BUDGET = 3000  # article context across all of a topic's articles
+
+# Trailing prompt section holding the compact fact list the app's chat uses as context
+CHAT_CONTEXT_HEADING = "## Chat Context"
+# The model doesn't always echo the heading exactly: also accept other heading
+# levels, bold, a trailing colon and any casing, as long as it's a line of its own
+_CHAT_CONTEXT_LINE = re.compile(
+    r"^[ \t]*(?:#{1,6}[ \t]*)?(?:\*\*|__)?[ \t]*chat context[ \t]*:?[ \t]*(?:\*\*|__)?[ \t]*:?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_HEADING_LINE = re.compile(r"^#{1,6} ", re.MULTILINE)
+
+
+def compress_text(text, rate=COMPRESSION_RATE):
+    """Drop low-salience tokens with LLMLingua-2, or return text unchanged if it's unavailable."""
+    global _compressor
+    if not HAS_LLMLINGUA or not text:
+        return text
+    try:
+        with _compressor_lock:
+            if _compressor is None:
+                from llmlingua import PromptCompressor
+
+                _compressor = PromptCompressor(model_name=COMPRESSION_MODEL, use_llmlingua2=True)
+        return _compressor.compress_prompt(text, rate=rate, force_tokens=["\n", "."])["compressed_prompt"]
+    except Exception as e:
+        print(f"  ⚠️  Prompt compression failed, using full text — {e}")
+        return text
+
+
+# Identical for every topic so provider-side prompt caching can reuse the whole prefix;
+# only the user message (topic + articles) varies between calls
+SUMMARY_SYSTEM_PROMPT = (
+    "You are an expert news analyst who provides concise, factual daily briefings. "
+    "STRICT RULES — violating any of these is a critical failure:\n"
+    "1. ONLY state facts that are explicitly present in the provided articles. "
+    "Never predict, speculate, or extrapolate beyond what the text says.\n"
+    "2. NEVER give advisory language such as 'investors should', 'companies should be prepared', "
+    "or 'it is important to monitor'. Report what happened, not what to do about it.\n"
+    "3. NEVER contradict information stated in the source articles. "
+    "If two sources conflict, note the disagreement instead of picking a side.\n"
+    "4. If a claim cannot be directly supported by a quote or fact from the articles, do not include it.\n\n"
+    "The user message gives a topic and the top news articles for it. "
+    "Based on these articles, provide a response in the following Markdown format:\n\n"
+    "## Executive Summary\n"
+    "Provide a concise 3-5 sentence overview of the most important developments.\n\n"
+    "## Market & Business Implications\n"
+    "Provide 3-5 bullet points on facts from the articles that are relevant to businesses, investors, or professionals. "
+    "Each bullet MUST be directly traceable to a specific article. Do NOT speculate on future outcomes or give advice.\n\n"
+    "## Beginner-Friendly Summary\n"
+    "Re-explain the executive summary in simple, everyday language that someone with no background in the topic could easily understand. "
+    "Avoid jargon and use short sentences. Do NOT add any information that was not in the Executive Summary.\n\n"
+    f"{CHAT_CONTEXT_HEADING}\n"
+    "List the key facts from the articles as terse bullet points, under 200 tokens in total. "
+    "Name the source of each fact. This section is reference material for follow-up questions, not shown to readers."
+)
 
-    # Assemble context from articles
+
+def _format_article(i, art):
+    """Prompt block for the i-th article, its body trimmed to ARTICLE_TOKEN_BUDGET."""
+    body = extract_salient(art.compressed_text or art.text, ARTICLE_TOKEN_BUDGET * CHARS_PER_TOKEN)
+    return f"**Article {i}: {art.title}**\nSource: {art.source} | Published: {art.published}\n{body}\n"
+
+
+def _build_messages(topic, articles):
+    """Assemble the Groq chat messages for one topic's articles."""
+    # Assemble context from articles, each cut to its token budget; once the
+    # prompt budget is spent, later (lower-ranked) articles are left out
     context_parts = []
+    budget = PROMPT_TOKEN_BUDGET
     for i, art in enumerate(articles, 1):
-        context_parts.append(
-            f"**Article {i}: {art['title']}**\n"
-            f"Source: {art['source']} | Published: {art['published']}\n"
-            f"{art['text']}\n"
-        )
+        part = _format_article(i, art)
+        cost = len(part) // CHARS_PER_TOKEN
+        if context_parts and cost > budget:
+            break
+        context_parts.append(part)
+        budget -= cost
 
     context = "\n---\n".join(context_parts)
 
-    prompt = (
-        f"You are an expert analyst. Below are the top news articles for the topic: **{topic}**.\n\n"
-        f"{context}\n\n"
-        f"Based on these articles, provide a response in the following Markdown format:\n\n"
-        f"## Executive Summary\n"
-        f"Provide a concise 3-5 sentence overview of the most important developments.\n\n"
-        f"## Market & Business Implications\n"
-        f"Provide 3-5 bullet points on facts from the articles that are relevant to businesses, investors, or professionals. "
-        f"Each bullet MUST be directly traceable to a specific article above. Do NOT speculate on future outcomes or give advice.\n\n"
-        f"## Beginner-Friendly Summary\n"
-        f"Re-explain the executive summary in simple, everyday language that someone with no background in {topic} could easily understand. "
-        f"Avoid jargon and use short sentences. Do NOT add any information that was not in the Executive Summary.\n\n"
-    )
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Topic: {topic}\n\n{context}"},
+    ]
+
+
+async def generate_summary(topic, articles):
+    """Use Groq (Llama 3.3 70b) to generate an executive summary, returning (summary, chat_context)."""
+    if not articles:
+        return "No articles were available to summarize for this topic.", ""
 
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert news analyst who provides concise, factual daily briefings. "
-                        "STRICT RULES — violating any of these is a critical failure:\n"
-                        "1. ONLY state facts that are explicitly present in the provided articles. "
-                        "Never predict, speculate, or extrapolate beyond what the text says.\n"
-                        "2. NEVER give advisory language such as 'investors should', 'companies should be prepared', "
-                        "or 'it is important to monitor'. Report what happened, not what to do about it.\n"
-                        "3. NEVER contradict information stated in the source articles. "
-                        "If two sources conflict, note the disagreement instead of picking a side.\n"
-                        "4. If a claim cannot be directly supported by a quote or fact from the articles, do not include it."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                },
-            ],
+        # A rerun over the same articles, in the same order and with the same instructions, skips the API call
+        content = await cached_completion(
+            client,
             model="llama-3.3-70b-versatile",
+            messages=_build_messages(topic, articles),
             temperature=0.2,
-            max_tokens=1024,
+            max_tokens=1280,  # room for the ~200-token chat context block
+            topic=topic,
+            articles=articles,
         )
-        return chat_completion.choices[0].message.content
     except Exception as e:
         print(f"  ⚠️  Groq API error for topic '{topic}': {e}")
-        return "Summary generation failed due to an API error."
+        return "Summary generation failed due to an API error.", ""
+
+    return split_chat_context(topic, content)
+
+
+def split_chat_context(topic, content):
+    """Split the chat gist off the completion so it never shows up in the rendered digest."""
+    match = _CHAT_CONTEXT_LINE.search(content)
+    if match is None:
+        print(f"  ⚠️  [{topic}] No '{CHAT_CONTEXT_HEADING}' section in the summary; chat will use the articles")
+        return content.strip(), ""
+    summary, rest = content[:match.start()].strip(), content[match.end():]
+    # The gist runs to the next heading; a section the model put after it stays in the digest
+    following = _HEADING_LINE.search(rest)
+    if following is None:
+        return summary, rest.strip()
+    return f"{summary}\n\n{rest[following.start():].strip()}".strip(), rest[:following.start()].strip()
 
 
 # --- Step 4: Main Loop & Data Storage ---
 
-def main():
-    """Main entry point: iterate topics, fetch news, summarize, and save to JSON."""
+OUTPUT_FILE = "daily_data.json"
+CHAT_ARTICLES_FILE = "daily_chat_context.json"
+TOPIC_DIR = Path("data/topics")  # per-topic results, written as soon as each topic is ready
+
+
+async def warm_groq_connection():
+    """Open the pooled Groq connection (DNS + TLS + HTTP/2) while feeds are still downloading.
+
+    Otherwise the first topic to finish scraping pays the handshake before its summary call.
+    """
+    try:
+        await client.with_options(max_retries=0).models.list()
+    except Exception:
+        pass  # best effort: the summary calls connect on their own
+
+
+async def process_topic(http, host_slots, article_cache, topic, feed_tasks, claimed_links):
+    """Fetch, summarize and persist one topic, returning (full_articles, encoded_topic_entry)."""
+    # Fetch and scrape articles
+    print(f"📰 [{topic}] Fetching articles from {len(feed_tasks)} feed(s)...")
+    articles = await fetch_news(http, host_slots, article_cache, feed_tasks, claimed_links, max_articles=5)
+    print(f"  ✅ [{topic}] Retrieved {len(articles)} article(s).")
+
+    # Compress once here so both the summary prompt and the app's chat reuse it; torch
+    # runs in a worker thread so other topics' downloads and Groq streams keep moving
+    for art in articles:
+        compressed = await asyncio.to_thread(compress_text, art.text)
+        # Only kept when compression actually ran, to keep the file lean
+        if compressed != art.text:
+            art.compressed_text = compressed
+
+    # Generate AI summary
+    print(f"  🤖 [{topic}] Generating AI summary...")
+    summary, chat_context = await generate_summary(topic, articles)
+
+    # Store structured data; the UI file keeps snippets only, full bodies go to the chat file
+    entry = Topic(
+        summary=summary,
+        chat_context=chat_context,
+        articles=[msgspec.structs.replace(art, text="", compressed_text=None) for art in articles],
+    )
+    # Persist right away so a later failure can't lose it and the app can show it early;
+    # the same bytes become this topic's section of daily_data.json
+    section = encode_topic(entry)
+    write_atomic(TOPIC_DIR / f"{topic}.json", section)
+    print(f"  ✅ [{topic}] Summary generated.")
+    return articles, section
+
+
+async def main():
+    """Main entry point: process every topic concurrently, then save the full digest to JSON."""
     print("🗞️  Daily News Bot — Starting...")
 
-    daily_data = {}
-
-    for topic, rss_urls in TOPICS.items():
-        print(f"\n📰 Processing topic: {topic}")
-
-        # Fetch and scrape articles
-        print(f"  🔍 Fetching articles from {len(rss_urls)} feed(s)...")
-        articles = fetch_news(rss_urls, max_articles=5)
-        print(f"  ✅ Retrieved {len(articles)} article(s).")
-
-        # Generate AI summary
-        print(f"  🤖 Generating AI summary...")
-        summary = generate_summary(topic, articles)
-        print(f"  ✅ Summary generated.")
-
-        # Store structured data
-        daily_data[topic] = {
-            "summary": summary,
-            "articles": [
-                {
-                    "title": art["title"],
-                    "link": art["link"],
-                    "published": art["published"],
-                    "source": art["source"],
-                    "text": art["text"],
-                }
-                for art in articles
-            ],
+    feed_cache = load_feed_cache()
+    article_cache = load_article_cache()
+    claimed_links = set()  # shared across topics: each article lands in one digest
+    host_slots = make_host_slots()
+    TOPIC_DIR.mkdir(parents=True, exist_ok=True)
+    warmup = asyncio.ensure_future(warm_groq_connection())
+    async with make_http_client() as http:
+        # Several topics list the same feed: start one fetch per unique URL and let
+        # every topic that lists it await that same task
+        feed_tasks = {
+            url: asyncio.ensure_future(_parse_feed(http, url, feed_cache))
+            for url in dict.fromkeys(url for rss_urls in TOPICS.values() for url in rss_urls)
         }
+        results = await asyncio.gather(
+            *(
+                process_topic(http, host_slots, article_cache, topic, [feed_tasks[url] for url in rss_urls], claimed_links)
+                for topic, rss_urls in TOPICS.items()
+            )
+        )
+    await warmup
+    save_feed_cache(feed_cache)
+    save_article_cache(article_cache)
 
-    # Add metadata with generation timestamp
-    daily_data["_meta"] = {
-        "generated_at": datetime.now(timezone.utc).isoformat(),
+    # One body per link; the topic entries' article lists are the ids into this table
+    chat_bodies = {
+        art.link: ArticleBody(text=art.text, compressed_text=art.compressed_text)
+        for articles, _ in results
+        for art in articles
     }
 
+    # Add metadata with generation timestamp
+    # Reuse each topic's already-encoded partial instead of serializing it again
+    sections = {topic: section for topic, (_, section) in zip(TOPICS, results)}
+    meta = Meta(generated_at=datetime.now(timezone.utc).isoformat())
+
     # Save to JSON for the frontend to read
-    output_path = "daily_data.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(daily_data, f, indent=2, ensure_ascii=False)
+    write_atomic(CHAT_ARTICLES_FILE, encode_chat_bodies(chat_bodies))
+    write_atomic(OUTPUT_FILE, encode_digest(sections, meta))
 
-    print(f"\n🎉 Done! Data saved to '{output_path}'.")
+    print(f"\n🎉 Done! Data saved to '{OUTPUT_FILE}' and '{CHAT_ARTICLES_FILE}'.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""On-disk cache of Groq completions keyed by a request or article-set hash, used by daily_bot.py."""
+import hashlib
+import time
+from pathlib import Path
+
+import msgspec
+
+from models import write_atomic
+
+CACHE_FILE = Path("data/llm_cache.json")
+LLM_CACHE_TTL = 7 * 24 * 3600  # seconds; same request over the same articles, so a week is safe
+
+
+class Completion(msgspec.Struct):
+    content: str
+    created: float
+
+
+_decoder = msgspec.json.Decoder(dict[str, Completion])
+_cache = None  # {key: Completion}, loaded on first use
+
+
+def _load():
+    global _cache
+    if _cache is None:
+        try:
+            _cache = _decoder.decode(CACHE_FILE.read_bytes())
+        except (OSError, msgspec.DecodeError):
+            _cache = {}
+    return _cache
+
+
+def _save(cache):
+    """Rewrite the cache atomically, dropping expired entries so the file doesn't grow forever."""
+    now = time.time()
+    live = {k: v for k, v in cache.items() if now - v.created < LLM_CACHE_TTL}
+    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(CACHE_FILE, msgspec.json.encode(live))
+
+
+def cache_key(model, messages, temperature, max_tokens):
+    request = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+    return hashlib.sha256(msgspec.json.encode(request, order="sorted")).hexdigest()
+
+
+def article_set_key(topic, articles, model, system_prompt, temperature, max_tokens):
+    """Fingerprint a summary by what it's generated from rather than by its rendered prompt.
+
+    That is the topic, its articles in order (link + body hash) and the instructions
+    (system prompt, model, sampling parameters). The user message is left out, so a
+    change in how the articles are laid out in it still reuses the summary. Order
+    matters because the summary cites articles by position.
+    """
+    fingerprint = {
+        "topic": topic,
+        "articles": [(a.link, hashlib.sha256(a.text.encode()).hexdigest()) for a in articles],
+        "instructions": cache_key(model, [{"role": "system", "content": system_prompt}], temperature, max_tokens),
+    }
+    return hashlib.sha256(msgspec.json.encode(fingerprint)).hexdigest()
+
+
+async def cached_completion(client, model, messages, temperature, max_tokens, topic=None, articles=None):
+    """Return the completion text for this request, calling Groq only on a miss or expired entry.
+
+    Entries are keyed by a hash of the full request, or by article_set_key when the
+    source `articles` (and their `topic`) are given.
+    """
+    cache = _load()
+    if articles is None:
+        key = cache_key(model, messages, temperature, max_tokens)
+    else:
+        system_prompt = "".join(m["content"] for m in messages if m["role"] == "system")
+        key = article_set_key(topic, articles, model, system_prompt, temperature, max_tokens)
+    hit = cache.get(key)
+    if hit is not None and time.time() - hit.created < LLM_CACHE_TTL:
+        return hit.content
+
+    # Streamed so the HTTP read timeout applies between tokens rather than to the
+    # whole generation, which would otherwise have to finish silently within it
+    stream = await client.chat.completions.create(
+        messages=messages,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+    )
+    parts = []
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+    content = "".join(parts)
+    if not content:
+        # Surface it like any other API failure rather than caching a blank summary
+        raise ValueError("Groq stream ended without any content")
+    cache[key] = Completion(content=content, created=time.time())
+    _save(cache)
+    return content
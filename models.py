@@ -0,0 +1,100 @@
+"""Typed records for daily_data.json, shared by daily_bot.py (writer) and app.py (reader)."""
+import os
+from pathlib import Path
+from typing import Optional
+
+import msgspec
+
+META_KEY = "_meta"
+
+
+class Article(msgspec.Struct, omit_defaults=True):
+    title: str
+    link: str
+    published: str
+    source: str
+    # What the UI shows; daily_data.json carries only this, not the full body
+    snippet: str = ""
+    # Full body and (when LLMLingua-2 actually ran) its compressed copy live in
+    # daily_chat_context.json as an ArticleBody keyed by link
+    text: str = ""
+    compressed_text: Optional[str] = None
+
+
+class ArticleBody(msgspec.Struct, omit_defaults=True):
+    """An article's full text, stored once per link in daily_chat_context.json."""
+    text: str = ""
+    compressed_text: Optional[str] = None
+
+
+class Topic(msgspec.Struct, omit_defaults=True):
+    summary: str
+    chat_context: str = ""
+    articles: list[Article] = []
+
+
+class Meta(msgspec.Struct):
+    generated_at: str
+
+
+class Digest(msgspec.Struct):
+    topics: dict[str, Topic]
+    meta: Optional[Meta] = None
+
+
+_encoder = msgspec.json.Encoder()
+_topic_decoder = msgspec.json.Decoder(Topic)
+_meta_decoder = msgspec.json.Decoder(Meta)
+_chat_bodies_decoder = msgspec.json.Decoder(dict[str, ArticleBody])
+
+
+def encode_digest(sections: dict[str, bytes], meta: Optional[Meta] = None) -> bytes:
+    """Serialize to the on-disk layout: one key per topic plus `_meta`, indented for readable diffs.
+
+    `sections` are topics already serialized with encode_topic; they are spliced in
+    verbatim as msgspec.Raw rather than encoded a second time.
+    """
+    payload = {name: msgspec.Raw(raw) for name, raw in sections.items()}
+    if meta is not None:
+        payload[META_KEY] = meta
+    return msgspec.json.format(_encoder.encode(payload), indent=2)
+
+
+def encode_topic(topic: Topic) -> bytes:
+    """Serialize one topic section on its own (the bot's per-topic partial files)."""
+    return msgspec.json.format(_encoder.encode(topic), indent=2)
+
+
+def decode_topic(raw: bytes) -> Topic:
+    return _topic_decoder.decode(raw)
+
+
+def decode_digest(raw: bytes) -> Digest:
+    """Parse daily_data.json, decoding each topic section straight into its Struct."""
+    sections = msgspec.json.decode(raw, type=dict[str, msgspec.Raw])
+    meta = sections.pop(META_KEY, None)
+    return Digest(
+        topics={name: _topic_decoder.decode(section) for name, section in sections.items()},
+        meta=_meta_decoder.decode(meta) if meta is not None else None,
+    )
+
+
+def encode_chat_bodies(bodies: dict[str, ArticleBody]) -> bytes:
+    """Serialize the link -> full body table used as the chat fallback context.
+
+    A topic's articles in daily_data.json carry the metadata and act as the ids,
+    so nothing but the text is stored here.
+    """
+    return msgspec.json.format(_encoder.encode(bodies), indent=2)
+
+
+def decode_chat_bodies(raw: bytes) -> dict[str, ArticleBody]:
+    return _chat_bodies_decoder.decode(raw)
+
+
+def write_atomic(path, payload: bytes) -> None:
+    """Write bytes via a temp file + rename so readers never see a half-written file."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
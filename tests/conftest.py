@@ -0,0 +1,7 @@
+import os
+import sys
+from pathlib import Path
+
+# daily_bot builds its Groq client at import time, which needs a key (never used offline)
+os.environ.setdefault("GROQ_API_KEY", "test")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+
+import daily_bot
+from models import Article
+
+
+def test_parse_feed_keeps_ampersands_after_html_entity():
+    feed = (
+        b"<rss><channel><title>Feed</title>"
+        b"<item><title>Markets&nbsp;open</title><link>https://x.com/a</link></item>"
+        b"<item><title>Q&amp;A time</title><link>https://news.google.com/x?a=1&amp;oc=5</link></item>"
+        b"</channel></rss>"
+    )
+    source, entries = daily_bot.parse_feed(feed)
+    assert source == "Feed"
+    assert entries[0]["title"] == "Markets\xa0open"
+    assert entries[1] == {"title": "Q&A time", "link": "https://news.google.com/x?a=1&oc=5"}
+
+
+def test_parse_feed_falls_back_on_unknown_entity():
+    feed = (
+        b"<rss><channel><title>Feed</title>"
+        b"<item><title>A&bogus;B</title><link>https://x.com/a?a=1&amp;b=2</link></item>"
+        b"</channel></rss>"
+    )
+    _, entries = daily_bot.parse_feed(feed)
+    assert entries[0]["link"] == "https://x.com/a?a=1&b=2"
+
+
+def test_canonical_link_strips_tracking_only():
+    assert daily_bot.canonical_link("https://WWW.Example.com/a?utm_source=rss&id=3#top") == "https://www.example.com/a?id=3"
+    assert daily_bot.canonical_link("https://x.com/story?ref=home") == "https://x.com/story?ref=home"
+
+
+def test_extract_text_keeps_punctuation_after_inline_markup():
+    html = (
+        "<html><head><title>Page</title></head><body><article>"
+        "<p>Apple's <a href='/m5'>M5</a>, announced <em>today</em>, is fast.</p>"
+        "<p>Wrapped\n   line.</p></article></body></html>"
+    )
+    assert daily_bot.extract_text(html) == ("Page", "Apple's M5, announced today, is fast.\n\nWrapped line.")
+
+
+def _run_fetch(monkeypatch, feeds, claimed=None, max_articles=5):
+    scraped = []
+
+    async def fake_scrape(http, host_slots, article_cache, entry, source_name, link, key):
+        scraped.append(link)
+        return Article(title=entry["title"], link=link, published="", source=source_name)
+
+    async def feed(entries):
+        return entries
+
+    monkeypatch.setattr(daily_bot, "_scrape", fake_scrape)
+    tasks = [feed(entries) for entries in feeds]
+    claimed = set() if claimed is None else claimed
+    articles = asyncio.run(daily_bot.fetch_news(None, None, {}, tasks, claimed, max_articles))
+    return articles, scraped, claimed
+
+
+def test_fetch_news_dedups_on_canonical_link_but_keeps_original(monkeypatch):
+    feeds = [
+        [({"title": "A", "link": "https://x.com/a?utm_source=feed1"}, "One")],
+        [({"title": "A", "link": "https://x.com/a?utm_source=feed2"}, "Two")],
+    ]
+    articles, scraped, claimed = _run_fetch(monkeypatch, feeds)
+    assert scraped == ["https://x.com/a?utm_source=feed1"]
+    assert [a.link for a in articles] == ["https://x.com/a?utm_source=feed1"]
+    assert claimed == {"https://x.com/a"}
+
+
+def test_fetch_news_skips_links_claimed_by_another_topic(monkeypatch):
+    feeds = [[({"title": "A", "link": "https://x.com/a"}, "One"), ({"title": "B", "link": "https://x.com/b"}, "One")]]
+    articles, _, _ = _run_fetch(monkeypatch, feeds, claimed={"https://x.com/a"})
+    assert [a.title for a in articles] == ["B"]
+
+
+def test_fetch_news_round_robin_advances_past_duplicates(monkeypatch):
+    feeds = [
+        [({"title": "X", "link": "https://x.com/x"}, "One"), ({"title": "A", "link": "https://x.com/a"}, "One")],
+        [({"title": "X", "link": "https://x.com/x"}, "Two"), ({"title": "B", "link": "https://x.com/b"}, "Two")],
+    ]
+    articles, _, _ = _run_fetch(monkeypatch, feeds, max_articles=2)
+    # Feed Two's duplicate doesn't cost it its turn
+    assert [(a.title, a.source) for a in articles] == [("X", "One"), ("B", "Two")]
+
+
+def test_generate_summary_falls_back_on_empty_completion(monkeypatch):
+    async def empty(*args, **kwargs):
+        raise ValueError("Groq stream ended without any content")
+
+    monkeypatch.setattr(daily_bot, "cached_completion", empty)
+    article = Article(title="A", link="https://x.com/a", published="", source="One", text="Body.")
+    summary, chat_context = asyncio.run(daily_bot.generate_summary("Tech", [article]))
+    assert summary.startswith("Summary generation failed")
+    assert chat_context == ""
+
+
+@pytest.mark.parametrize("heading", ["## Chat Context", "### chat context", "**Chat Context:**", "Chat Context"])
+def test_split_chat_context_accepts_heading_variants(heading):
+    content = f"## Executive Summary\nThings happened.\n\n{heading}\n- fact (Reuters)"
+    assert daily_bot.split_chat_context("Tech", content) == ("## Executive Summary\nThings happened.", "- fact (Reuters)")
+
+
+def test_split_chat_context_ignores_inline_mentions():
+    content = "## Executive Summary\nSee the chat context below.\n"
+    assert daily_bot.split_chat_context("Tech", content) == ("## Executive Summary\nSee the chat context below.", "")
+
+
+def test_parse_feed_reads_atom():
+    feed = (
+        b'<feed xmlns="http://www.w3.org/2005/Atom"><title>Atom</title><entry><title>E1</title>'
+        b'<link rel="replies" href="https://x.com/c#comments"/><link href="https://x.com/c"/>'
+        b"<published>2024-01-03T00:00:00Z</published></entry></feed>"
+    )
+    assert daily_bot.parse_feed(feed) == (
+        "Atom",
+        [{"title": "E1", "link": "https://x.com/c", "published": "2024-01-03T00:00:00Z"}],
+    )
+
+
+def test_parse_feed_ignores_extension_namespace_fields():
+    feed = (
+        b'<rss xmlns:media="http://search.yahoo.com/mrss/" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd"'
+        b' xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        b"<channel><itunes:title>Podcast</itunes:title><title>Feed</title><item>"
+        b"<media:title>Media first</media:title><title>Real</title>"
+        b'<atom:link rel="self" href="https://x.com/feed"/><link>https://x.com/real</link>'
+        b"<dc:date>2024-01-02</dc:date></item></channel></rss>"
+    )
+    assert daily_bot.parse_feed(feed) == ("Feed", [{"title": "Real", "link": "https://x.com/real", "published": "2024-01-02"}])
+
+
+def test_parse_feed_reads_rss1():
+    feed = (
+        b'<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns="http://purl.org/rss/1.0/">'
+        b"<channel><title>RDF</title></channel><item><title>R1</title><link>https://x.com/r</link></item></rdf:RDF>"
+    )
+    assert daily_bot.parse_feed(feed) == ("RDF", [{"title": "R1", "link": "https://x.com/r"}])
+
+
+def test_extract_salient_keeps_lede_and_order_within_budget():
+    lede = "Apple unveiled the M5 chip on Monday. The M5 chip doubles GPU speed."
+    filler = " ".join(f"Weather note {i} says skies stay grey." for i in range(40))
+    text = f"{lede}\n\n{filler} Analysts expect the M5 chip to lift Apple revenue."
+    out = daily_bot.extract_salient(text, budget=300)
+    assert len(out) <= 300
+    assert out.startswith(lede)
+    assert out.endswith("Analysts expect the M5 chip to lift Apple revenue.")
+
+
+def test_extract_salient_leaves_short_text_alone():
+    assert daily_bot.extract_salient("Short.", budget=100) == "Short."
+
+
+def test_split_chat_context_keeps_later_sections_in_summary():
+    content = "## Executive Summary\nThings.\n\n## Chat Context\n- fact (Reuters)\n\n## Beginner-Friendly Summary\nSimply put."
+    assert daily_bot.split_chat_context("Tech", content) == (
+        "## Executive Summary\nThings.\n\n## Beginner-Friendly Summary\nSimply put.",
+        "- fact (Reuters)",
+    )
@@ -0,0 +1,104 @@
+import asyncio
+
+import msgspec
+import pytest
+
+import llm_cache
+from llm_cache import article_set_key
+from models import Article
+
+
+def _articles(n=3):
+    return [Article(title=f"T{i}", link=f"https://x.com/{i}", published="", source="", text=f"body {i}") for i in range(n)]
+
+
+def _key(articles, topic="Tech", system="rules", temperature=0.2):
+    return article_set_key(topic, articles, "llama-3.3-70b-versatile", system, temperature, 1280)
+
+
+def test_article_set_key_is_stable():
+    assert _key(_articles()) == _key(_articles())
+
+
+def test_article_set_key_depends_on_order():
+    articles = _articles()
+    assert _key(articles) != _key(articles[::-1])
+
+
+def test_article_set_key_depends_on_topic_prompt_and_params():
+    articles = _articles()
+    assert _key(articles) != _key(articles, topic="AI")
+    assert _key(articles) != _key(articles, system="edited rules")
+    assert _key(articles) != _key(articles, temperature=0.5)
+
+
+def test_article_set_key_depends_on_body_not_title():
+    articles = _articles()
+    retitled = [msgspec.structs.replace(a, title="New title") for a in articles]
+    edited = [msgspec.structs.replace(a, text=a.text + " more") for a in articles]
+    assert _key(articles) == _key(retitled)
+    assert _key(articles) != _key(edited)
+
+
+class _Delta:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.delta = _Delta(content)
+
+
+class _Chunk:
+    def __init__(self, *contents):
+        self.choices = [_Choice(c) for c in contents]
+
+
+class _FakeClient:
+    """Stands in for AsyncGroq, streaming the given chunks."""
+
+    def __init__(self, chunks):
+        self.chat = self
+        self.completions = self
+        self.chunks = chunks
+
+    async def create(self, **kwargs):
+        async def stream():
+            for chunk in self.chunks:
+                yield chunk
+
+        return stream()
+
+
+def test_empty_stream_raises_and_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "CACHE_FILE", tmp_path / "llm_cache.json")
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    client = _FakeClient([_Chunk(None), _Chunk()])  # a trailing usage chunk has no choices
+    with pytest.raises(ValueError):
+        asyncio.run(llm_cache.cached_completion(client, "m", [], 0.2, 10))
+    assert not (tmp_path / "llm_cache.json").exists()
+
+
+def test_stream_is_joined_and_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "CACHE_FILE", tmp_path / "llm_cache.json")
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    client = _FakeClient([_Chunk("Hello "), _Chunk("world"), _Chunk()])
+    assert asyncio.run(llm_cache.cached_completion(client, "m", [], 0.2, 10)) == "Hello world"
+    client.chunks = []
+    assert asyncio.run(llm_cache.cached_completion(client, "m", [], 0.2, 10)) == "Hello world"
+
+
+def test_article_set_hit_ignores_user_message_layout(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "CACHE_FILE", tmp_path / "llm_cache.json")
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    client = _FakeClient([_Chunk("Summary")])
+    articles = _articles()
+
+    def complete(user):
+        messages = [{"role": "system", "content": "rules"}, {"role": "user", "content": user}]
+        return asyncio.run(llm_cache.cached_completion(client, "m", messages, 0.2, 10, topic="Tech", articles=articles))
+
+    assert complete("Topic: Tech\n\n**Article 1: T0**") == "Summary"
+    client.chunks = []
+    assert complete("Topic: Tech\n\n### Article 1 — T0") == "Summary"
@@ -0,0 +1,34 @@
+from models import (
+    Article,
+    ArticleBody,
+    Meta,
+    Topic,
+    decode_chat_bodies,
+    decode_digest,
+    encode_chat_bodies,
+    encode_digest,
+    encode_topic,
+)
+
+
+def test_digest_round_trip():
+    topic = Topic(
+        summary="## Executive Summary\nThings happened.",
+        chat_context="- fact (Reuters)",
+        articles=[Article(title="A", link="https://x.com/a", published="Mon", source="Reuters", snippet="Lede.")],
+    )
+    meta = Meta(generated_at="2026-01-01T00:00:00+00:00")
+    raw = encode_digest({"Tech": encode_topic(topic), "AI": encode_topic(Topic(summary="Empty"))}, meta)
+    digest = decode_digest(raw)
+    assert list(digest.topics) == ["Tech", "AI"]
+    assert digest.topics["Tech"] == topic
+    assert digest.topics["AI"].articles == []
+    assert digest.meta == meta
+
+
+def test_chat_bodies_round_trip():
+    bodies = {
+        "https://x.com/a": ArticleBody(text="Full text."),
+        "https://x.com/b": ArticleBody(text="T", compressed_text="t"),
+    }
+    assert decode_chat_bodies(encode_chat_bodies(bodies)) == bodies